@@ -19,7 +19,11 @@ BeeCalc: Cross-platform notebook calculator with robust unit support
 
 """
 
+import array
+import bisect
+import functools
 import json
+import logging
 import math
 import re
 import sys
@@ -28,11 +32,12 @@ import pydoc
 from pathlib import Path
 from fractions import Fraction
 import unitclass
-from PyQt6.QtCore import (QEvent, QFile, QTextStream,
-                          QRegularExpression, QSize, Qt, QTimer)
-from PyQt6.QtGui import (QColor, QFont, QFontDatabase, QIcon,
+from PyQt6.QtCore import (QEvent, QFile, QTextStream, QPoint,
+                          QRegularExpression, QSize, Qt, QThreadPool, QTimer)
+from PyQt6.QtGui import (QBrush, QColor, QFont, QFontDatabase, QIcon,
                          QKeySequence, QPixmap, QShortcut, QSyntaxHighlighter,
-                         QTextCharFormat, QTextOption, QTextCursor)
+                         QTextBlockFormat, QTextCharFormat, QTextOption,
+                         QTextCursor)
 from PyQt6.QtWidgets import (QApplication, QCheckBox, QComboBox, QToolTip,
                              QDialog, QDialogButtonBox, QFontComboBox, QMenu, QTabWidget,
                              QGroupBox, QHBoxLayout, QLabel,
@@ -42,13 +47,16 @@ from PyQt6.QtWidgets import (QApplication, QCheckBox, QComboBox, QToolTip,
                              QVBoxLayout, QWidget)
 
 import beenotepad
-import time
 # resources not explicitly used, but used in QFile, QIcon, QPixmap, etc.
 import resources
 
 basedir = os.path.dirname(__file__)
 sys.path.append(basedir)
 
+# debug logging is a no-op unless a handler/level is configured, unlike
+# print which grabs the stdio lock on every call
+logger = logging.getLogger('beecalc')
+
 
 class ConfirmationDialog(QDialog):
     def __init__(self, parent, title, message):
@@ -141,6 +149,53 @@ default_themes = {
 
 num_formats = {'Auto': 'g', 'Fix': 'f'}
 
+
+def _err_syntax(errstr):
+    if errstr.startswith("'(' was never closed"):
+        return "<Unclosed '('>", "'(' was never closed"
+    return '?', 'Invalid syntax'
+
+
+def _err_value(errstr):
+    if errstr.startswith("Bad Func"):
+        return '<Unknown function>', f"{errstr.split()[2]}: no such function"
+    return '?', errstr
+
+
+# evaluation-error handling: exception type -> (output cell, status text);
+# looked up along the type's MRO so subclasses match their nearest entry
+_ERROR_HANDLERS = {
+    SyntaxError: _err_syntax,
+    IndexError: lambda errstr: ('?', 'Invalid syntax'),
+    ZeroDivisionError:
+        lambda errstr: ('<Zero Division>', 'Divide by zero not possible'),
+    unitclass.InconsistentUnitsError:
+        lambda errstr: ('<Inconsistent units>', errstr),
+    ValueError: _err_value,
+    unitclass.UnavailableUnit:
+        lambda errstr: ('<No unit/var>',
+                        f"{errstr.split()[1]}: no such unit, variable, or constant"),
+}
+
+
+# output formatting: exact type -> formatter(out, spec); anything else
+# (ints, complex, strings) falls back to the generic f-string path
+_FMT_DISPATCH = {
+    float: format,
+    unitclass.Unit: format,
+    Fraction: lambda out, spec: str(out),
+}
+
+
+def _zeropt(text):
+    """Alignment width: characters from the first '.' or ' ' to the end."""
+    point = text.find('.')
+    space = text.find(' ')
+    if point == -1 or (space != -1 and space < point):
+        point = space
+    return len(text) - point if point != -1 else 0
+
+
 default_settings = dict(
     num_fixdigits='5',
     num_autodigits='10',
@@ -216,95 +271,279 @@ def initililize_config():
     return settings, current, notepads
 
 
-parser = beenotepad.BeeParser()
-function_list = sorted(list(parser.functions.keys()))
-constant_list = list(parser.constants.keys())
-unit_list = []
-for name, unit in unitclass._units.items():
-    # if name not in unit_list:
-    #     unit_list.extend([name] + (unit['aliases'] if unit['aliases'] else []))
-    unit_variations = [name] + (unit['aliases'] if unit['aliases'] else [])
-    unit_list.extend([x for x in unit_variations if x not in unit_list])
-unit_list.sort()
-
+# Building a BeeParser and walking the full unitclass tables takes long
+# enough to notice at startup, so all of these are built on first use
+# (functools.cache) rather than at import.  MainWindow warms them on a
+# worker thread while the window paints.
+
+@functools.cache
+def get_parser():
+    return beenotepad.BeeParser()
+
+
+@functools.cache
+def get_function_list():
+    return tuple(sorted(get_parser().functions.keys()))
+
+
+@functools.cache
+def get_constant_list():
+    # sorted so prefix lookups can bisect it like the other word lists
+    return tuple(sorted(get_parser().constants.keys()))
+
+
+@functools.cache
+def get_unit_list():
+    unit_names = set()
+    for name, unit in unitclass._units.items():
+        unit_names.add(name)
+        if unit['aliases']:
+            unit_names.update(unit['aliases'])
+    return tuple(sorted(unit_names))
+
+
+def _prefix_range(words, prefix):
+    """Slice of a sorted word tuple whose entries start with prefix."""
+    lo = bisect.bisect_left(words, prefix)
+    hi = bisect.bisect_left(words, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+    return words[lo:hi]
+
+
+@functools.cache
+def _compile_pattern(pattern):
+    # Plain rules run through re.finditer (one C-level scan per rule);
+    # only the lookbehind rules stay on QRegularExpression.  Cached so
+    # patterns the input and output rule sets share (units, \$, \?,
+    # operators, numbers) compile once total.
+    if '(?<' in pattern:
+        compiled = QRegularExpression(pattern)
+        compiled.optimize()  # compile/JIT now, not on first match
+        return compiled
+    return re.compile(pattern)
+
+
+def _compile_rules(rule_pairs):
+    return tuple((None if pattern is None else _compile_pattern(pattern),
+                  color_key) for pattern, color_key in rule_pairs)
+
+
+# The function/constant name alternations never change at runtime, so
+# build each string once and share it instead of re-joining the escaped
+# names every time a rule set is assembled.
+
+@functools.cache
+def get_function_alternation():
+    return r'\b(?:' + '|'.join(map(re.escape, get_function_list())) + r')\('
+
+
+@functools.cache
+def get_constant_alternation():
+    return r'\b(?:' + '|'.join(map(re.escape, get_constant_list())) + r')\b'
+
+
+# Rule patterns are theme-independent: only the QTextCharFormat color changes
+# between themes, so compile each pattern once on first use and share the
+# compiled objects across both highlighters and across theme rebuilds.  The
+# variable rule is the lone exception (its pattern mutates with the notepad's
+# variables), so it stays per-instance and is marked with None here.
+
+@functools.cache
+def get_input_rules():
+    return _compile_rules((  # order matters below, more general go first and are overridden by more specific
+        (r'[a-zA-Z_Ωμ°]+[0-9⁰¹²³⁴⁵⁶⁷⁸⁹]*', 'color_unit'),  # units
+        (r'\$', 'color_unit'),  # units
+        (r'(?<=\d)\s*%', 'color_unit'),  # %
+        (r'(?<=\d)\s*%\s*(?=\d)', 'color_operator'),  # %
+        (get_function_alternation(), 'color_function'),  # function call
+        (r'[+-/*=(),^]', 'color_operator'),  # operator
+        (r'\?', 'color_error'),  # ERROR
+        (get_constant_alternation(), 'color_constant'),  # constant
+        (r"\b\d+\.*\d*([Ee][-+]?)?\d?", 'color_text'),  # numbers
+        (r' to ', 'color_conversion'),  # conversion
+        # (r'(?<=[a-zA-Z_Ωμ°][0-9⁰¹²³⁴⁵⁶⁷⁸⁹])|(?<=[a-zA-Z_Ωμ°@])\s*(( in )|( to ))(?=[a-zA-Z_Ωμ°])', 'color_conversion'),  # conversion
+        # (r'(?<=[a-zA-Z_Ωμ°][0-9⁰¹²³⁴⁵⁶⁷⁸⁹])|(?<=[a-zA-Z_Ωμ°@])\s*(( in )|( to ))\s*(?=[a-zA-Z_Ωμ°])', 'color_conversion'),  # conversion
+        (r'(?<=%)\s+of\s+', 'color_conversion'),  # conversion
+        (r'@', 'color_variable'),  # variable name
+        (r'\w+\s*(?==)', 'color_variable'),  # variable name
+        (None, 'color_variable'),  # variable name (per-instance var_re)
+        (r'#.*$', 'color_comment'),  # comment
+    ))
+
+
+@functools.cache
+def get_output_rules():
+    return _compile_rules((  # order matters below, more general go first and are overridden by more specific
+        (r'[a-zA-Z_Ωμ°%]+[0-9⁰¹²³⁴⁵⁶⁷⁸⁹]*', 'color_unit'),  # units
+        (r'%', 'color_unit'),  # %
+        (r'\$', 'color_unit'),  # units
+        (r'[+-/*=(),]', 'color_operator'),  # operator
+        (r'\?', 'color_error'),  # ERROR
+        (r'<.*?>', 'color_error'),  # ERROR
+        (r"\b\d+\.*\d*([Ee]|[Ee]-)*\d*", 'color_text'),  # numbers
+    ))
+
+
+def _warm_caches():
+    # run on a worker thread at startup so first tab completion is instant
+    get_input_rules()
+    get_output_rules()
+    get_function_list()
+    get_constant_list()
+    get_unit_list()
+
+
+@functools.cache
+def _brush(color):
+    # themes reuse a handful of colors; one shared brush per hex lets Qt
+    # ref-share it across every format that uses the color
+    return QBrush(QColor(color))
+
+
+def _merge_spans(spans):
+    # Coalesce adjacent/overlapping same-format matches so each block needs
+    # fewer setFormat crossings.  Order is preserved: later rules still
+    # override earlier ones where they overlap.
+    merged = []
+    for start, length, char_format in spans:
+        if merged:
+            prev_start, prev_length, prev_format = merged[-1]
+            if (prev_format is char_format
+                    and prev_start <= start <= prev_start + prev_length):
+                merged[-1] = (prev_start,
+                              max(prev_length, start + length - prev_start),
+                              prev_format)
+                continue
+        merged.append((start, length, char_format))
+    return merged
+
+
+class BeeSyntaxHighlighter(QSyntaxHighlighter):
+    """Rule-table highlighter shared by the input and output panes.
+
+    Subclasses supply the compiled rule table; the base owns the format
+    objects, the per-block span cache, and the visible-range gating.
+    """
 
-class BeeInputSyntaxHighlighter(QSyntaxHighlighter):
-    def __init__(self, settings, variables, parent=None):
+    def __init__(self, settings, parent=None):
         super().__init__(parent)  # type: ignore
+        self._build_rules(settings)
+        # blockNumber -> (text, spans): replay formats for unchanged blocks
+        self._block_cache = {}
+        # only blocks in this window get formatted; None means no limit
+        self._visible_lo = 0
+        self._visible_hi = None
 
-        self.rules = []
-        self.var_re_str = r'(?<!\w )\b({})\b'
-        self.var_re = QRegularExpression(
-            r'|'.join([self.var_re_str.format(w) for w in variables]))
-        rule_pairs = [  # order matters below, more general go first and are overridden by more specific
-            (r'[a-zA-Z_Ωμ°]+[0-9⁰¹²³⁴⁵⁶⁷⁸⁹]*', settings.color_unit),  # units
-            (r'\$', settings.color_unit),  # units
-            (r'(?<=\d)\s*%', settings.color_unit),  # %
-            (r'(?<=\d)\s*%\s*(?=\d)', settings.color_operator),  # %
-            ('|'.join([rf'(\b{i}\()' for i in function_list]),
-             settings.color_function),  # function call
-            (r'[+-/*=(),^]', settings.color_operator),  # operator
-            (r'\?', settings.color_error),  # ERROR
-            ('|'.join([rf'(\b{i}\b)' for i in constant_list]),
-             settings.color_constant),  # constant
-            (r"\b\d+\.*\d*([Ee][-+]?)?\d?", settings.color_text),  # numbers
-            (r' to ', settings.color_conversion),  # conversion
-            # (r'(?<=[a-zA-Z_Ωμ°][0-9⁰¹²³⁴⁵⁶⁷⁸⁹])|(?<=[a-zA-Z_Ωμ°@])\s*(( in )|( to ))(?=[a-zA-Z_Ωμ°])', settings.color_conversion),  # conversion
-            # (r'(?<=[a-zA-Z_Ωμ°][0-9⁰¹²³⁴⁵⁶⁷⁸⁹])|(?<=[a-zA-Z_Ωμ°@])\s*(( in )|( to ))\s*(?=[a-zA-Z_Ωμ°])', settings.color_conversion),  # conversion
-            (r'(?<=%)\s+of\s+', settings.color_conversion),  # conversion
-            (r'@', settings.color_variable),  # variable name
-            (r'\w+\s*(?==)', settings.color_variable),  # variable name
-            (self.var_re, settings.color_variable),  # variable name
-            (r'#.*$', settings.color_comment),  # comment
-        ]
-        for regexp, color in rule_pairs:
-            rule_format = QTextCharFormat()
-            rule_format.setForeground(QColor(color))
-            if isinstance(regexp, str):
-                self.rules.append((QRegularExpression(regexp), rule_format))
-            else:
-                self.rules.append((self.var_re, rule_format))
+    def _rule_table(self):
+        raise NotImplementedError
 
-    def updateVars(self, variables):
-        self.var_re.setPattern(
-            r'|'.join([self.var_re_str.format(w) for w in variables]))
+    def _rule_pattern(self, pattern):
+        # hook for per-instance patterns (the input pane's variable rule)
+        return pattern
+
+    def _build_rules(self, settings):
+        self.rules = []
+        # several rules share a color; give them one format object so Qt
+        # has fewer distinct formats to diff per block
+        fmt_for = {}
+        for pattern, color_key in self._rule_table():
+            color = settings[color_key]
+            rule_format = fmt_for.get(color)
+            if rule_format is None:
+                rule_format = fmt_for[color] = QTextCharFormat()
+                rule_format.setForeground(_brush(color))
+            self.rules.append((self._rule_pattern(pattern), rule_format))
+
+    def update_colors(self, settings):
+        """Point the existing rules at a new theme's colors.
+
+        The compiled patterns (and the variable pattern) carry over; only
+        the formats are rebuilt, so a theme change skips re-parsing.
+        """
+        self._build_rules(settings)
+        self._block_cache.clear()
+        self.rehighlight()
+
+    def setVisibleRange(self, first, last):
+        old_first, old_last = self._visible_lo, self._visible_hi
+        self._visible_lo, self._visible_hi = first, last
+        if old_last is None:
+            return
+        doc = self.document()
+        for number in range(first, last + 1):
+            if old_first <= number <= old_last:
+                continue  # already styled while it was visible
+            block = doc.findBlockByNumber(number)
+            if block.isValid():
+                self.rehighlightBlock(block)
 
     def highlightBlock(self, text):
-        # print(self.var_re)
+        setFormat = self.setFormat
+        if self._visible_hi is not None:
+            number = self.currentBlock().blockNumber()
+            if number < self._visible_lo or number > self._visible_hi:
+                return  # styled later by setVisibleRange when scrolled into view
+        cached = self._block_cache.get(self.currentBlock().blockNumber())
+        if cached is not None and cached[0] == text:
+            for start, length, char_format in cached[1]:
+                setFormat(start, length, char_format)
+            return
+        spans = []
+        append = spans.append
         for pattern, char_format in self.rules:
-            match_iterator = QRegularExpression(pattern).globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(),
-                               match.capturedLength(), char_format)
+            if isinstance(pattern, QRegularExpression):
+                match_iterator = pattern.globalMatch(text)
+                while match_iterator.hasNext():
+                    match = match_iterator.next()
+                    append((match.capturedStart(),
+                            match.capturedLength(), char_format))
+            else:
+                for match in pattern.finditer(text):
+                    start, end = match.span()
+                    append((start, end - start, char_format))
+        spans = _merge_spans(spans)
+        for start, length, char_format in spans:
+            setFormat(start, length, char_format)
+        self._block_cache[self.currentBlock().blockNumber()] = (text, spans)
 
 
-class BeeOutputSyntaxHighlighter(QSyntaxHighlighter):
-    def __init__(self, settings, parent=None):
-        super().__init__(parent)  # type: ignore
+class BeeInputSyntaxHighlighter(BeeSyntaxHighlighter):
+    def __init__(self, settings, variables, parent=None):
+        # one alternation inside a single lookbehind/word-boundary pair so
+        # PCRE evaluates the context checks once per position, not per name
+        self.var_re_str = r'(?<!\w )\b(?:{})\b'
+        # double sort canonicalizes the tuple (same trick as the parser's
+        # _names_pattern): longest first, alphabetical within a length, so
+        # the same name set always compares equal in updateVars
+        self._vars_tuple = tuple(
+            sorted(sorted(variables), key=len, reverse=True))
+        self.var_re = QRegularExpression(
+            self.var_re_str.format('|'.join(
+                map(re.escape, self._vars_tuple))))
+        self.var_re.optimize()
+        super().__init__(settings, parent)
 
-        self.rules = []
-        rule_pairs = [  # order matters below, more general go first and are overridden by more specific
-            (r'[a-zA-Z_Ωμ°%]+[0-9⁰¹²³⁴⁵⁶⁷⁸⁹]*', settings.color_unit),  # units
-            (r'%', settings.color_unit),  # %
-            (r'\$', settings.color_unit),  # units
-            (r'[+-/*=(),]', settings.color_operator),  # operator
-            (r'\?', settings.color_error),  # ERROR
-            (r'<.*?>', settings.color_error),  # ERROR
-            (r"\b\d+\.*\d*([Ee]|[Ee]-)*\d*", settings.color_text),  # numbers
-        ]
-        for regexp, color in rule_pairs:
-            rule_format = QTextCharFormat()
-            rule_format.setForeground(QColor(color))
-            self.rules.append((QRegularExpression(regexp), rule_format))
+    def _rule_table(self):
+        return get_input_rules()
+
+    def _rule_pattern(self, pattern):
+        # the (None, 'color_variable') slot is this instance's var pattern
+        return pattern if pattern is not None else self.var_re
+
+    def updateVars(self, variables):
+        new_vars = tuple(sorted(sorted(variables), key=len, reverse=True))
+        if new_vars == self._vars_tuple:
+            return False  # same name set, the pattern is already right
+        self._vars_tuple = new_vars
+        self.var_re.setPattern(
+            self.var_re_str.format('|'.join(map(re.escape, new_vars))))
+        self.var_re.optimize()
+        self._block_cache.clear()
+        return True
 
-    def highlightBlock(self, text):
-        for pattern, char_format in self.rules:
-            match_iterator = QRegularExpression(pattern).globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(),
-                               match.capturedLength(), char_format)
+
+class BeeOutputSyntaxHighlighter(BeeSyntaxHighlighter):
+    def _rule_table(self):
+        return get_output_rules()
 
 
 class BeeCalcStatusBar(QWidget):
@@ -409,7 +648,8 @@ class BeeCalcTitleBar(QWidget):
         add_button(self.trash_button)
         add_button(self.settings_button, 20)
         add_button(self.stats_button)
-        print(self.settings_button.styleSheet())
+        logger.debug('settings button stylesheet: %s',
+                     self.settings_button.styleSheet())
 
         self.title = QLabel(parent.windowTitle(), self)
         self.title.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -432,7 +672,6 @@ class BeeCalcTitleBar(QWidget):
 
 
 class MainWindow(QMainWindow):
-    re_zeropoint = re.compile(r"[. ]|$")
     re_incomplete = re.compile(r'(.*?\s*)\b(\w+)$')
     re_functionname = re.compile(r'\b(\w+)\($')
 
@@ -455,6 +694,26 @@ class MainWindow(QMainWindow):
         # self.status_bar.addPermanentWidget(self.statslabel)
 
         self.notepad = beenotepad.BeeNotepad()
+        # joined-text cache per notepad index, dropped when a notepad mutates
+        self._notepad_text_cache = {}
+        # previous processNotepad run: input lines, per-line results, and
+        # a parser-vars snapshot before each line, so an edit re-evaluates
+        # only from the first changed line
+        self._proc_lines = []
+        self._proc_results = []
+        self._proc_snapshots = []
+        # len(notepad.input) after each line, to rewind the notepad's
+        # input/output log along with the vars snapshots
+        self._proc_io_lens = []
+        self._proc_fmt_spec = None
+        self._proc_text = None
+        self._proc_align = None
+        self._proc_errstrs = []
+        # rendered output lines from the last run, for block-level updates
+        self._out_lines = []
+        # evaluation is not re-entrant: signals fired while we rewrite the
+        # output (rehighlight, cursor restores) must not start a nested run
+        self._processing = False
         input_text = self.getNotepadText(self.current)
 
         font_families = QFontDatabase.families()
@@ -485,6 +744,7 @@ class MainWindow(QMainWindow):
         self.input.setWordWrapMode(QTextOption.WrapMode.NoWrap)
         self.output.setWordWrapMode(QTextOption.WrapMode.NoWrap)
         self.input.setAcceptRichText(False)
+        self.alignOutputRight()
         self.syntax_highlighter_in = BeeInputSyntaxHighlighter(
             self.settings, tuple(self.notepad.parser.vars.keys()), self.input.document())
         self.syntax_highlighter_out = BeeOutputSyntaxHighlighter(
@@ -496,6 +756,10 @@ class MainWindow(QMainWindow):
         self.keepScrollSynced = True
         self.inputScrollbar.valueChanged.connect(self.syncScroll)
         self.outputScrollbar.valueChanged.connect(self.syncScroll)
+        self.inputScrollbar.valueChanged.connect(
+            self.updateVisibleHighlightRange)
+        self.outputScrollbar.valueChanged.connect(
+            self.updateVisibleHighlightRange)
 
         self.input.setHorizontalScrollBarPolicy(
             Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
@@ -508,6 +772,11 @@ class MainWindow(QMainWindow):
         # need this for tab completion
         self.tabPopupVisable = False
 
+        # single reused timer for delayed notepad processing
+        self.processTimer = QTimer(self)
+        self.processTimer.setSingleShot(True)
+        self.processTimer.timeout.connect(self.processNotepad)
+
         self.title_bar = BeeCalcTitleBar(self)
 
         # Notepad combo box
@@ -553,7 +822,10 @@ class MainWindow(QMainWindow):
 
         self.setCentralWidget(container)
 
-        self.input.cursorPositionChanged.connect(self.processNotepad)
+        # fill the lazy word lists while the window paints
+        QThreadPool.globalInstance().start(_warm_caches)
+
+        self.input.cursorPositionChanged.connect(self.debouncedProcessNotepad)
         self.input.setText(input_text)
         cursor = self.input.textCursor()
         cursor.setPosition(len(input_text))
@@ -667,10 +939,12 @@ class MainWindow(QMainWindow):
         return super().eventFilter(obj, event)
 
     def delayedProcessNotepad(self, t=5):
-        self.timer = QTimer()
-        self.timer.setSingleShot(True)
-        self.timer.timeout.connect(self.processNotepad)
-        self.timer.start(t)
+        self.processTimer.start(t)
+
+    def debouncedProcessNotepad(self):
+        # restarting the countdown on every cursor move means only the
+        # last keystroke of a fast typing burst triggers an evaluation
+        self.processTimer.start(120)
 
     def tabCompletion(self):
         position = self.input.textCursor().position()
@@ -678,20 +952,21 @@ class MainWindow(QMainWindow):
         result = self.re_incomplete.search(line)
 
         if result:
-            print(result.groups())
-            print(result.groupdict())
-            print(result.start(), result.pos, result.span())
+            logger.debug('completion match: %s %s %s',
+                         result.groups(), result.start(), result.span())
             word = result.groups()[1]
             variables = [x for x in self.notepad.parser.vars.keys()
                          if x.startswith(word)]
-            constants = [
-                x for x in self.notepad.parser.constants.keys() if x.startswith(word)]
-            funcs = [f'{x}(' for x in function_list if word in x]
-            units = [x for x in unit_list if word in x]
-            wordlist = variables + constants + funcs + units
-            priority = [w for w in wordlist if w.startswith(word)]
-            rest = [w for w in wordlist if not w.startswith(word)]
-            wordlist = priority + rest
+            # prefix matches bisect the sorted word lists; the substring
+            # stragglers still need a full scan but sort last
+            constants = list(_prefix_range(get_constant_list(), word))
+            funcs = [f'{x}(' for x in _prefix_range(get_function_list(), word)]
+            units = list(_prefix_range(get_unit_list(), word))
+            rest = [f'{x}(' for x in get_function_list()
+                    if word in x and not x.startswith(word)]
+            rest += [x for x in get_unit_list()
+                     if word in x and not x.startswith(word)]
+            wordlist = variables + constants + funcs + units + rest
             start, end = position - \
                 len(line) + result.start() + len(result.groups()[0]), position
             self.replace_position = (start, end)
@@ -716,7 +991,7 @@ class MainWindow(QMainWindow):
 
     def tabReplaceWord(self):
         newword = self.sender().currentText()  # type: ignore
-        print(f"Completed word: '{newword}'")
+        logger.debug("completed word: '%s'", newword)
         start, end = self.replace_position
         text = self.input.toPlainText()
         self.input.setText(text[:start]+newword+text[end:])
@@ -758,7 +1033,11 @@ class MainWindow(QMainWindow):
         self.styleScrollbar()
 
     def getNotepadText(self, num):
-        return "\n".join(self.notepads[num])
+        cached = self._notepad_text_cache.get(num)
+        if cached is None:
+            cached = "\n".join(self.notepads[num])
+            self._notepad_text_cache[num] = cached
+        return cached
 
     def getNotepadHeaders(self, trim=0):
         if trim:
@@ -781,6 +1060,7 @@ class MainWindow(QMainWindow):
         confirm = ConfirmationDialog(
             self, "Delete?", "Delete current notepad?").exec()
         if confirm:
+            self._notepad_text_cache.clear()  # indexes shift on delete
             self.notepads = self.notepads[:self.current] + \
                 self.notepads[self.current+1:]
             if not self.notepads:
@@ -801,6 +1081,28 @@ class MainWindow(QMainWindow):
             elif sender == self.outputScrollbar:
                 self.inputScrollbar.setValue(value)
 
+    def updateVisibleHighlightRange(self):
+        # Limit highlighting to roughly the blocks on screen; the margin
+        # keeps small scrolls from landing on unstyled lines before the
+        # range update runs.
+        margin = 50
+        for editor, highlighter in ((self.input, self.syntax_highlighter_in),
+                                    (self.output, self.syntax_highlighter_out)):
+            first = editor.cursorForPosition(QPoint(0, 0)).blockNumber()
+            last = editor.cursorForPosition(
+                QPoint(0, editor.viewport().height() - 1)).blockNumber()
+            highlighter.setVisibleRange(max(0, first - margin), last + margin)
+
+    def resizeEvent(self, event):
+        # growing the window exposes blocks without any scrollbar signal,
+        # so recompute the visible range here too
+        super().resizeEvent(event)
+        self.updateVisibleHighlightRange()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.updateVisibleHighlightRange()
+
     def populateNotepadBox(self):
         self.notepadBox.clear()
         for i in self.getNotepadHeaders():
@@ -999,7 +1301,7 @@ class MainWindow(QMainWindow):
                                ):
             tmp = QPlainTextEdit()
             tab_widget.addTab(tmp, name)
-            print(filename)
+            logger.debug('loading license file %s', filename)
             lfile = QFile(":"+filename)
             lfile.open(QFile.OpenModeFlag.ReadOnly | QFile.OpenModeFlag.Text)
             tmp.setPlainText(QTextStream(lfile).readAll())
@@ -1048,12 +1350,9 @@ class MainWindow(QMainWindow):
             self.title_bar.pin_button.setText("○")
 
     def changeAlignment(self):
+        # both modes right-align the blocks (decimal alignment comes from
+        # the padding), and the block formats already carry AlignRight
         self.settings.align = self.alignment.isChecked()
-        self.output.setReadOnly(False)
-        if self.settings.align:
-            self.output.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        else:
-            self.output.setAlignment(Qt.AlignmentFlag.AlignRight)
         self.processNotepad()
 
     def changeNumFormat(self):
@@ -1088,15 +1387,16 @@ class MainWindow(QMainWindow):
 
     def changeTheme(self, theme):
         self.settings = settingsdict(self.settings | default_themes[theme])
-        self.syntax_highlighter_in = BeeInputSyntaxHighlighter(
-            self.settings, tuple(self.notepad.parser.vars.keys()), self.input.document())
-        self.syntax_highlighter_out = BeeOutputSyntaxHighlighter(
-            self.settings, self.output.document())
+        # retarget the existing highlighters: rebuilding them re-parses
+        # the whole document, swapping formats just rehighlights
+        self.syntax_highlighter_in.update_colors(self.settings)
+        self.syntax_highlighter_out.update_colors(self.settings)
         self.updateStyle()
 
     def saveCurrentNotepad(self):
         self.notepads[self.current] = self.input.toPlainText().split(
             "\n")  # type: ignore
+        self._notepad_text_cache.pop(self.current, None)
 
     def updateFont(self):
         font = QFont()
@@ -1123,140 +1423,224 @@ class MainWindow(QMainWindow):
         self.settings.font_bold = True if value else False
         self.updateFont()
 
+    def alignOutputRight(self):
+        # merged into the block formats, the alignment sticks to blocks
+        # spliced in later, so this only needs to run at startup and after
+        # a full setText (which resets the block formats)
+        fmt = QTextBlockFormat()
+        fmt.setAlignment(Qt.AlignmentFlag.AlignRight)
+        cursor = QTextCursor(self.output.document())
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.mergeBlockFormat(fmt)
+
     def processNotepad(self):
         # try:
         #     self.input.textChanged.disconnect()
         # except TypeError:
         #     pass
+        if self._processing:
+            # a signal fired mid-run (rehighlight, cursor restore) tried to
+            # start a nested evaluation; the outer run already covers it
+            return
+        self._processing = True
+        try:
+            self._processNotepad()
+        finally:
+            self._processing = False
+
+    def _processNotepad(self):
         self.keepScrollSynced = False
-        initial_vars = tuple(self.notepad.parser.vars.keys())
-        self.notepad.clear()
+        text = self.input.toPlainText()
+        fmt_spec = '.' + self.settings.num_digits + \
+            num_formats[self.settings.num_fmt]
+        if text == self._proc_text and fmt_spec == self._proc_fmt_spec \
+                and self.settings.align == self._proc_align:
+            # pure cursor movement: nothing that feeds the output changed,
+            # the stored results still stand
+            for errstr in self._proc_errstrs:
+                self.status_bar.showMessage(errstr, 3000)
+            self.outputScrollbar.setValue(self.inputScrollbar.value())
+            self.keepScrollSynced = True
+            return
+        # the vars dict bumps its version on every assignment, so a
+        # same-object same-version check at the end is O(1) instead of
+        # snapshotting the key tuple twice
+        initial_vars = self.notepad.parser.vars
+        initial_version = initial_vars.version
+        lines = text.split('\n')
+
+        # find the first line that changed since the last run; the
+        # unchanged prefix reuses its stored results and the parser vars
+        # rewind to their snapshot at that point, so typing at the bottom
+        # of a long notepad only re-evaluates the edited tail
+        prev_lines = self._proc_lines if fmt_spec == self._proc_fmt_spec else []
+        snapshots = self._proc_snapshots
+        common = 0
+        limit = min(len(prev_lines), len(lines), len(snapshots) - 1)
+        if prev_lines and self._proc_text is not None \
+                and text.startswith(self._proc_text):
+            # typing at the bottom: every line before the last previous
+            # one is unchanged by construction, skip straight past them
+            common = min(len(prev_lines) - 1, limit)
+        while common < limit and lines[common] == prev_lines[common]:
+            common += 1
+        self._proc_fmt_spec = fmt_spec
+        self._proc_text = text
+        self._proc_align = self.settings.align
+        if common:
+            parser_vars = self.notepad.parser.vars
+            # clear/update bypass __setitem__, so record a rewind that
+            # changes the name set by bumping the version by hand
+            if parser_vars.keys() != snapshots[common].keys():
+                parser_vars.version += 1
+            parser_vars.clear()
+            parser_vars.update(snapshots[common])
+            del snapshots[common + 1:]
+            # append() logs every evaluated line on the notepad, so the
+            # log rewinds with the vars or stale tails pile up run after run
+            io_lens = self._proc_io_lens
+            del self.notepad.input[io_lens[common]:]
+            del self.notepad.output[io_lens[common]:]
+            del io_lens[common + 1:]
+            results = self._proc_results[:common]
+        else:
+            self.notepad.clear()
+            parser_vars = self.notepad.parser.vars
+            snapshots = self._proc_snapshots = [{}]
+            io_lens = self._proc_io_lens = [0]
+            results = []
+
         self.output.setReadOnly(False)
-        all_output = []
+        # bind the loop-invariant attribute chains once; inside the loop
+        # they are then single LOAD_FAST lookups
+        notepad_append = self.notepad.append
+        notepad_input = self.notepad.input
+        results_append = results.append
+        snapshots_append = snapshots.append
+        io_lens_append = io_lens.append
         errored = False
-        any_errored = False
-        widest_entry = 0
-        total = []
-        for line in self.input.toPlainText().split('\n'):
+        for line in lines[common:]:
+            numval = None
             try:
 
-                out = self.notepad.append(line)
+                out = notepad_append(line)
                 if out not in ([], ):  # weed out empty lines
-                    if (not isinstance(out, complex)) and math.isclose(out, 0, abs_tol=1e-15):
+                    # plain compare beats math.isclose's kwargs path here;
+                    # Units and Fractions clamp too, so 1mm - 1mm shows 0
+                    if isinstance(out, (float, unitclass.Unit, Fraction)) \
+                            and -1e-15 <= float(out) <= 1e-15:
                         out = 0
-                    if isinstance(out, (float, unitclass.Unit)):
-                        # type: ignore
-                        fmt_str = '{:.'+self.settings.num_digits + \
-                            num_formats[self.settings.num_fmt]+'}'
-                        text = fmt_str.format(out)
-                        zeropt = len(text) - \
-                            self.re_zeropoint.search(text).start()
-                        if zeropt > widest_entry:
-                            widest_entry = zeropt
-                        outtext = (text, zeropt)
-                    elif isinstance(out, Fraction):
-                        text = str(out)
-                        zeropt = len(text) - \
-                            self.re_zeropoint.search(text).start()
-                        if zeropt > widest_entry:
-                            widest_entry = zeropt
-                        outtext = (text, zeropt)
-                    else:
-                        text = f'{out}'
-                        zeropt = len(text) - \
-                            self.re_zeropoint.search(text).start()
-                        if zeropt > widest_entry:
-                            widest_entry = zeropt
-                        outtext = (text, zeropt)
-                    try:
-                        total.append(float(out))
-                    except:
-                        pass
+                    fmt = _FMT_DISPATCH.get(type(out))
+                    text = fmt(out, fmt_spec) if fmt is not None else f'{out}'
+                    outtext = (text, _zeropt(text))
+                    # explicit type check instead of try/float/except: no
+                    # exception frame on every non-numeric line
+                    if isinstance(out, (int, float, Fraction, unitclass.Unit)):
+                        numval = float(out)
                 else:
                     outtext = ('', 0)
                 if out:
-                    self.notepad.parser.vars['ans'] = out
-            except SyntaxError as err:
+                    parser_vars['ans'] = out
+            except Exception as err:
+                # print('err object:', err)
                 errstr, errored = str(err), True
-                # print('err object:', errstr)
-                if errstr.startswith("'(' was never closed"):
-                    out_msg = "<Unclosed '('>"
-                    errstr = "'(' was never closed"
+                for cls in type(err).__mro__:
+                    handler = _ERROR_HANDLERS.get(cls)
+                    if handler is not None:
+                        out_msg, errstr = handler(errstr)
+                        break
                 else:
                     out_msg = '?'
-                    errstr = "Invalid syntax"
-            except IndexError as err:
-                errstr, errored = str(err), True
-                out_msg = '?'
-                errstr = 'Invalid syntax'
-            except ZeroDivisionError as err:
-                errstr, errored = str(err), True
-                out_msg = '<Zero Division>'
-                errstr = "Divide by zero not possible"
-            except unitclass.InconsistentUnitsError as err:
-                errstr, errored = str(err), True
-                # print('err2', time.asctime())
-                out_msg = '<Inconsistent units>'
-            except ValueError as err:
-                errstr, errored = str(err), True
-                if errstr.startswith("Bad Func"):
-                    out_msg = '<Unknown function>'
-                    errstr = f"{errstr.split()[2]}: no such function"
-                else:
-                    out_msg = '?'
-                    errstr = errstr
-            except unitclass.UnavailableUnit as err:
-                errstr, errored = str(err), True
-                # print('err2', time.asctime())
-                out_msg = '<No unit/var>'
-                errstr = f"{errstr.split()[1]}: no such unit, variable, or constant"
-            except (NameError, TypeError,
-                    AttributeError, Exception) as err:
-                # print('err1', time.asctime())
-                errstr, errored = str(err), True
-                out_msg = '?'
 
             if errored:
                 # print('here1:', out_msg)
                 # print('here2:', errstr)
-                any_errored = True
-                self.status_bar.showMessage(errstr, 3000)
-                outtext = (out_msg, len(out_msg))
-            all_output.append(outtext)
+                results_append(((out_msg, len(out_msg)), None, True, errstr))
+            else:
+                results_append((outtext, numval, False, ''))
             errored = False
-        if not any_errored:
+            snapshots_append(dict(parser_vars))
+            io_lens_append(len(notepad_input))
+        self._proc_lines = lines
+        self._proc_results = results
+
+        # rebuild the run-wide aggregates from the stored per-line results
+        errstrs = []
+        widest_entry = 0
+        total = array.array('d')  # unboxed doubles, one contiguous buffer
+        total_append = total.append
+        for outtext, numval, line_errored, errstr in results:
+            if line_errored:
+                errstrs.append(errstr)
+            else:
+                if outtext[1] > widest_entry:
+                    widest_entry = outtext[1]
+                if numval is not None:
+                    total_append(numval)
+        if errstrs:
+            for errstr in errstrs:
+                self.status_bar.showMessage(errstr, 3000)
+        else:
             self.status_bar.clearMessage()
+        self._proc_errstrs = errstrs
 
+        # build the display strings straight from the results, skipping
+        # the intermediate (text, width) list this used to go through
         if self.settings.align:
-            all_output = [t+' '*(widest_entry-n) for t, n in all_output]
+            # one shared pad buffer; pad[n:] has the widest_entry-n spaces
+            # each line needs (and is empty when n exceeds the width)
+            pad = ' ' * widest_entry
+            all_output = [r[0][0] + pad[r[0][1]:] for r in results]
+        else:
+            all_output = [r[0][0] for r in results]
+        # setText relays out the whole document; when the block count
+        # still matches, splice only the lines that changed
+        doc = self.output.document()
+        prev_out = self._out_lines
+        if not prev_out or doc.blockCount() != len(prev_out):
+            self.output.setText("\n".join(all_output))
+            self.alignOutputRight()
         else:
-            all_output = [t for t, n in all_output]
-        self.output.setText("\n".join(all_output))
-        orig_cursor = self.output.textCursor()
-        self.output.selectAll()
-        self.output.setAlignment(Qt.AlignmentFlag.AlignRight)
-        # cursor = self.output.textCursor()
-        # cursor.clearSelection()
-        # self.output.setTextCursor(cursor)
-        self.output.setTextCursor(orig_cursor)
+            cursor = QTextCursor(doc)
+            cursor.beginEditBlock()
+            for i, new_text in enumerate(all_output[:len(prev_out)]):
+                if new_text != prev_out[i]:
+                    block = doc.findBlockByNumber(i)
+                    cursor.setPosition(block.position())
+                    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock,
+                                        QTextCursor.MoveMode.KeepAnchor)
+                    cursor.insertText(new_text)
+            if len(all_output) > len(prev_out):
+                cursor.movePosition(QTextCursor.MoveOperation.End)
+                cursor.insertText('\n' + '\n'.join(all_output[len(prev_out):]))
+            elif len(all_output) < len(prev_out):
+                block = doc.findBlockByNumber(len(all_output) - 1)
+                cursor.setPosition(block.position())
+                cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+                cursor.movePosition(QTextCursor.MoveOperation.End,
+                                    QTextCursor.MoveMode.KeepAnchor)
+                cursor.removeSelectedText()
+            cursor.endEditBlock()
+        self._out_lines = all_output
         self.output.setReadOnly(True)
         self.outputScrollbar.setValue(self.inputScrollbar.value())
         self.keepScrollSynced = True
-        final_vars = tuple(self.notepad.parser.vars.keys())
-        if initial_vars != final_vars:
-            self.syntax_highlighter_in.updateVars(
-                self.notepad.parser.vars.keys())
-            self.syntax_highlighter_in.rehighlight()
+        final_vars = self.notepad.parser.vars
+        if final_vars is not initial_vars or \
+                final_vars.version != initial_version:
+            # updateVars compares against the sorted name set, so value
+            # reassignments and reorderings skip the full-document repass
+            if self.syntax_highlighter_in.updateVars(final_vars.keys()):
+                self.syntax_highlighter_in.rehighlight()
         # self.syntax_highlighter_in = BeeInputSyntaxHighlighter(self.settings,tuple(self.notepad.parser.vars.keys()), self.input.document())
         # self.input.textChanged.connect(self.processNotepad)
         n = len(total)
-        sum_ = sum(total)
+        sum_ = math.fsum(total)  # single C-level pass, exact for floats
         if n:
             avg = f'{sum_/n:g}'
         else:
             avg = 'N/A'
         self.stats = {'count': f'{n}', 'sum': f'{sum_:g}', 'average': f'{avg}'}
-        # print('processed', time.asctime())
 
 
 app = QApplication(sys.argv)
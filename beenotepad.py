@@ -19,16 +19,117 @@ BeeCalc: Cross-platform notebook calculator with robust unit support
 
 """
 import ast
+import copy
+import functools
 import math
 import operator
 import re
+from collections import ChainMap
 from unitclass import Unit
 import unitclass
 from fractions import Fraction
 from decimal import Decimal
 
 
+@functools.lru_cache(maxsize=512)
+def _cached_ast_parse(text):
+    """Parse preprocessed text to an AST, caching repeated inputs.
+
+    Notepads re-evaluate the same lines constantly, so the parsed
+    tree is cached. ASTs are never mutated after parsing, so the
+    cached module can be shared freely.
+    """
+    return ast.parse(text)
+
+
+# Node/operator types that CPython's own evaluator handles exactly like the
+# tree walker, so these expressions can be compiled once and run via eval().
+_PLAIN_NODES = (ast.Module, ast.Expr, ast.Expression, ast.BinOp, ast.UnaryOp,
+                ast.Constant, ast.Name, ast.Load)
+_PLAIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+              ast.Pow, ast.LShift, ast.RShift, ast.BitOr, ast.BitAnd,
+              ast.USub, ast.UAdd)
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_expr(text):
+    """Compile preprocessed text to a reusable code object when possible.
+
+    Only plain arithmetic qualifies: assignments, calls, and unit
+    conversions still need the tree walker's custom semantics, so those
+    return None. Returns (code, names) where names are the identifiers
+    the caller must resolve before running the code.
+    """
+    tree = _cached_ast_parse(text)
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.Expr):
+        return None
+    allowed = _PLAIN_NODES + _PLAIN_OPS
+    names = []
+    for node in ast.walk(tree):
+        if type(node) is ast.Name:
+            names.append(node.id)
+        elif not isinstance(node, allowed):
+            return None
+    expr = ast.fix_missing_locations(ast.Expression(tree.body[0].value))
+    return compile(expr, '<bee>', 'eval'), tuple(names)
+
+
+_MISSING = object()  # sentinel so vars/constants equal to 0 still resolve
+
+
+@functools.lru_cache(maxsize=1024)
+def _unit_proto(*args):
+    return Unit(*args)
+
+
+def _cached_unit(*args):
+    """Build a Unit, reusing a cached prototype for repeated literals.
+
+    Unit parsing is the dominant cost of evaluating unit-heavy lines and
+    the same value/unit pairs recur constantly in a notepad. Unit.to()
+    mutates in place, so callers get a copy of the cached prototype.
+    Call _unit_proto.cache_clear() if unit definitions ever change.
+    """
+    if len(args) == 2:
+        # Unit(value, 'mm'): one prototype per unit string, any value --
+        # the value is stored verbatim, so swap it in on the copy
+        value, unitstr = args
+        if type(value) in (int, float) and type(unitstr) is str:
+            unit = copy.copy(_unit_proto(unitstr))
+            unit.value = value
+            return unit
+    for arg in args:
+        if type(arg) not in (int, float, str):
+            return Unit(*args)
+    return copy.copy(_unit_proto(*args))
+
+
+class VarsDict(dict):
+    """Variable store that counts writes.
+
+    Callers can snapshot ``version`` around an evaluation to tell whether
+    it assigned anything, without diffing the dict contents.
+    """
+    __slots__ = ('version',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.version += 1
+
+
 class BeeParser():
+    __slots__ = ('vars', 'constants', 'operations', 'functions',
+                 'angle_funcs', '_eval_globals', '_names_key', '_names_re',
+                 '_dispatch', '_debug', '_lookup')
+
     num_re = r"([.]\b(?:\d+)(?:[Ee]([+-])?(?:\d+)?)?\b)|(?:\b(?:\d+)(?:[.,]?(?:\d*))?(?:[Ee](?:[+-])?(?:\d+)?)?)"
     unit_re = re.compile(
         r"(?<![a-zA-Z])(" + num_re + r")?\s*(?![eE][-+\d])([a-zA-Z_Ωμ°]+(?![(])(?:(?:\^|\*\*)?[0-9]+)*)(?:\b|$|(?=\)))(?!\(|\s*[=])")
@@ -42,7 +143,7 @@ class BeeParser():
     of_re = re.compile(r"%\s+of\s+")
     factorial_re = re.compile(r"(\d+)\s*!")
     # names_re = re.compile(r"\b[a-zA-Z]+\b(?!\s*=)")
-    names_re = re.compile(r"(?<![\w.@)] )\b([a-zA-Z]\w*)\b(?!=| =)")
+    # names_re = re.compile(r"(?<![\w.@)] )\b([a-zA-Z]\w*)\b(?!=| =)")
     # (?<![\d.)])\s*(\b[a-zA-Z]\w*\b)\s*(?!=)
     parens_math = re.compile(r"(?<!\w)\([0-9 +-/*^]+?\)")
     extra_spaces_re = re.compile(r"\s\s+")
@@ -51,12 +152,15 @@ class BeeParser():
     # re_frac = re.compile(r'frac\(\s*('+num_re+r')\s*\)')
     re_frac = re.compile(r'frac\(\s*((?:-|\+)*\d*\.*\d+[eE]*(?:-|\+)*\d*)\s*\)')
     no_leading_zero_decimal = re.compile(r"(?<!\d)\.")
+    # plain numeric assignment, e.g. 'a = 2' -- skips the full parse pipeline
+    assign_fast_re = re.compile(r"^\s*([A-Za-z_]\w*)\s*=\s*([-+]?\d+(?:\.\d+)?)\s*$")
 
     to_specials = str.maketrans("0123456789*", "⁰¹²³⁴⁵⁶⁷⁸⁹·")
     from_specials = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⋅·×", "0123456789***")
 
     def __init__(self, vars=None) -> None:
-        self.vars = vars or {}
+        self.vars = VarsDict(vars or {})
+        self._debug = False
 
         self.constants = {
             'e': math.e,
@@ -68,21 +172,23 @@ class BeeParser():
             'τ': math.tau,
         }
 
+        # plain lambdas instead of operator.*: the inline BINARY_OP caches
+        # (PEP 659) specialize these, which builtin functions don't get
         self.operations = {
-            ast.Add: operator.add,
-            ast.Sub: operator.sub,
-            ast.Mult: operator.mul,
-            ast.Div: operator.truediv,
-            ast.FloorDiv: operator.floordiv,
-            ast.Mod: operator.mod,
-            ast.Pow: operator.pow,
-            ast.LShift: operator.lshift,
-            ast.RShift: operator.rshift,
-            ast.BitOr: operator.or_,
-            # ast.BitXor: operator.pow,
-            ast.BitAnd: operator.and_,
-            ast.USub: operator.neg,
-            ast.UAdd: operator.pos,
+            ast.Add: lambda a, b: a + b,
+            ast.Sub: lambda a, b: a - b,
+            ast.Mult: lambda a, b: a * b,
+            ast.Div: lambda a, b: a / b,
+            ast.FloorDiv: lambda a, b: a // b,
+            ast.Mod: lambda a, b: a % b,
+            ast.Pow: lambda a, b: a ** b,
+            ast.LShift: lambda a, b: a << b,
+            ast.RShift: lambda a, b: a >> b,
+            ast.BitOr: lambda a, b: a | b,
+            # ast.BitXor: lambda a, b: a ^ b,
+            ast.BitAnd: lambda a, b: a & b,
+            ast.USub: lambda a: -a,
+            ast.UAdd: lambda a: +a,
             ast.In: self.convert,
         }
 
@@ -149,15 +255,62 @@ class BeeParser():
             'frac': self._frac,
         }
 
-        self.angle_funcs = ['cos', 'sin', 'tan']
+        # frozenset: checked on every function call in the evaluator
+        self.angle_funcs = frozenset(('cos', 'sin', 'tan'))
+
+        # globals for the compiled-expression fast path: constants resolve
+        # here, vars are passed as locals so they shadow constants
+        self._eval_globals = {'__builtins__': {}} | self.constants
+
+        # name-substitution regex, rebuilt lazily when the var set changes
+        self._names_key = ()
+        self._names_re = None
+
+        # single probe for Name resolution; vars shadow constants
+        self._lookup = ChainMap(self.vars, self.constants)
+
+        # one dict probe per node instead of an isinstance ladder
+        self._dispatch = {
+            ast.Module: self._eval_module,
+            ast.Expr: self._eval_expr,
+            ast.BinOp: self._eval_binop,
+            ast.UnaryOp: self._eval_unaryop,
+            ast.Assign: self._eval_assign,
+            ast.Compare: self._eval_compare,
+            ast.Call: self._eval_call,
+            ast.Name: self._eval_name,
+            ast.Constant: self._eval_constant,
+            ast.List: self._eval_seq,
+            ast.Tuple: self._eval_seq,
+        }
+
+    def _names_pattern(self):
+        """Alternation regex over known constant/var names.
+
+        Only matches names that can actually be substituted, so the
+        replacer never fires on unit names or other identifiers. Cached
+        and rebuilt only when the set of names changes.
+        """
+        names = tuple(sorted(sorted(self.constants.keys() | self.vars.keys()),
+                             key=len, reverse=True))
+        if names != self._names_key:
+            self._names_key = names
+            self._names_re = re.compile(
+                r"(?<![\w.@)] )\b(" + "|".join(map(re.escape, names)) + r")\b(?!=| =)")
+        return self._names_re
+
+    def _unit_replacer(self, match):
+        numstr = match.group(1) or 1
+        unitstr = match.group(4)
+        # print(f'  num: "{numstr}"')
+        # print(f'  unit: "{unitstr}"')
+        if unitstr in ('i', 'j'):
+            return f'complex(0,{float(numstr)})'
+        return f"Unit('{numstr} {unitstr}')"
 
     def _replacer(self, match):
-        repl = self.constants.get(match.group(1).strip()) or self.vars.get(match.group(1).strip())
-        # print('trying to replace...')
-        # print('   match: ', match.group(1).strip())
+        repl = self.constants.get(match.group(1)) or self.vars.get(match.group(1))
         if repl:
-            # return str(f'{repl}')
-            # print('   replacing ', repl)
             return f'({repl})'
         else:
             return match.group()  # no replacement
@@ -194,7 +347,15 @@ class BeeParser():
         else:  # left side was not a unit
             return Unit(value).simplify()
 
-    def parse(self, text, debug=False):
+    def parse_debug(self, text):
+        """Like parse, but prints the preprocessed text and AST dump."""
+        self._debug = True
+        try:
+            return self.parse(text)
+        finally:
+            self._debug = False
+
+    def parse(self, text):
         """Preprocess input string before parsing
 
         The 'of' operator must come at the end of the line, only folowed by a number.
@@ -206,17 +367,33 @@ class BeeParser():
         text = self.extra_spaces_re.sub(' ', text)
         text = self.eliminate_spaces_re.sub('', text)
 
-        if '#' in text:
-            text = text[:text.find('#')]
-
-        text = text.replace('@', 'ans')
+        text = text.partition('#')[0]
+
+        # simple assignments don't need preprocessing or an AST at all
+        if match := self.assign_fast_re.match(text):
+            name, val = match.groups()
+            self.vars[name] = float(val) if '.' in val else int(val)
+            return self.vars[name]
+
+        if '@' in text:
+            text = text.replace('@', 'ans')
+
+        # pure numeric expressions (with or without variables) compile once
+        # and re-run directly, skipping substitution and the tree walker;
+        # the compiled code is keyed on the text, so the same formula reused
+        # with changing variable values never recompiles (in debug mode,
+        # fall through so the preprocessed text and AST still get dumped)
+        if not self._debug:
+            fast = self._eval_fast(text)
+            if fast is not _MISSING:
+                return fast
         text = self.double_in_re.sub(' in to ', text)
 
-        # add leading zeros 
-        #   no leading zero with no space between unit leads to error: .34mm 
+        # add leading zeros
+        #   no leading zero with no space between unit leads to error: .34mm
         #   ('0.34mm' and '.34 mm' are okay)
-        while match := self.no_leading_zero_decimal.search(text):
-            text = text[:match.start()] + '0.' + text[match.end():]
+        if '.' in text:
+            text = self.no_leading_zero_decimal.sub('0.', text)
 
         # process 'of' first so % doesn't get confused with the % unit
         if match := self.of_re.search(text):
@@ -225,20 +402,19 @@ class BeeParser():
 
         text = self.percent_re.sub('pct', text)
 
-        while match := self.factorial_re.search(text):
-            text = text[:match.start()] + f'factorial({match.group(1)})' + text[match.end():]
+        if '!' in text:
+            text = self.factorial_re.sub(r'factorial(\1)', text)
 
         # preprocess vars/constants to make them work with units
         # print("BEFORE:",text)
-        text = self.names_re.sub(self._replacer, text)
+        text = self._names_pattern().sub(self._replacer, text)
         # print("     >:",text)
 
         # handle money, $ prefix to USD suffix
-        while match := self.money_re.search(text):
-            text = text[:match.start()] + f'{match.group(1)} USD' + text[match.end():]
+        if '$' in text:
+            text = self.money_re.sub(r'\1 USD', text)
             # print("money1:",text)
-        while match := self.money_to_re.search(text):
-            text = text[:match.start()] + f' to USD' + text[match.end():]
+            text = self.money_to_re.sub(' to USD', text)
             # print("money2:",text)
 
         # process 'in' conversion
@@ -254,147 +430,186 @@ class BeeParser():
         # print('7>', text)
         text = text.translate(self.from_specials)
 
-        unit_replacements = {}
-        unit_idx = 1
-        while match := self.unit_re.search(text):
-            # print('unit match:', match.group())
-            numstr = match.group(1) or 1
-            unitstr = match.group(4)
-            # print(f'  num: "{numstr}"')
-            # print(f'  unit: "{unitstr}"')
-            if unitstr in ('i', 'j'):
-                replacement = f'complex(0,{float(numstr)})'
-            else:
-                replacement = f"Unit('{numstr} {unitstr}')"
-            idx = f'@@{unit_idx}@@'
-            unit_idx += 1
-            unit_replacements[idx] = replacement
-            text = text[:match.start()] + idx + text[match.end():]
-        for key, val in unit_replacements.items():
-            text = text.replace(key, val)
+        # single pass; sub never rescans replacement text, so the Unit(...)
+        # it inserts can't be re-matched as a unit itself
+        text = self.unit_re.sub(self._unit_replacer, text)
         # print('8>', text)
 
         # Restore the to placeholder for the in operator
         text = text.replace('@@@', 'in ')
         # implied multiplication
         text = text.replace(")Unit('", ")*Unit('")
+        text = text.replace(") Unit('", ")*Unit('")
 
         # text = re_frac
         text = self.re_frac.sub(r'frac("\1")', text)
 
-        if debug:
+        if self._debug:
             print("Preprocessed text:", text)
-            print(ast.dump(ast.parse(text), indent=2))
+
+        # one tree shared by the debug dump and the evaluator
+        tree = _cached_ast_parse(text)
+
+        if self._debug:
+            print(ast.dump(tree, indent=2))
 
         # print('evaluate:', text)
-        value = self.evaluate(text)
+        if not self._debug:
+            fast = self._eval_fast(text)
+            if fast is not _MISSING:
+                return fast
+        value = self.evaluate(tree)
         return value
 
+    def _eval_fast(self, text):
+        """Run text through the compiled-expression fast path if it can.
+
+        Returns _MISSING when the expression needs the full pipeline:
+        anything that isn't plain arithmetic, or that references a name
+        which isn't a known var or constant (e.g. a bare unit).
+        """
+        try:
+            compiled = _compile_expr(text)
+        except SyntaxError:
+            return _MISSING
+        if compiled is None:
+            return _MISSING
+        code, names = compiled
+        # constants first to match the substitution precedence in _replacer
+        lookup = ChainMap(self.constants, self.vars)
+        for name in names:
+            value = lookup.get(name, _MISSING)
+            if value is _MISSING or type(value) not in (int, float, complex):
+                # Fraction/Unit-valued names must take the substitution
+                # path so result types match the full pipeline
+                return _MISSING
+        return eval(code, self._eval_globals, lookup)
+
     def evaluate(self, node):
         # print(ast.dump(ast.parse('x + y', mode='eval'), indent=4))
 
         if isinstance(node, str):
-            return self.evaluate(ast.parse(node))
-
-        elif isinstance(node, ast.Module):
-            values = []
-            for body in node.body:
-                values.append(self.evaluate(body))
-            if len(values) == 1:
-                values = values[0]
-            return values
-
-        elif isinstance(node, (list, tuple, ast.List, ast.Tuple)):
-            print("found seq")
-            print(node)
-            print(ast.literal_eval(node))
-            return [self.evaluate(str(child_node)) for child_node in ast.literal_eval(node)]
-
-        elif isinstance(node, ast.Expr):
-            return self.evaluate(node.value)
-
-        elif isinstance(node, ast.BinOp):
-            left = self.evaluate(node.left)
-            right = self.evaluate(node.right)
-            try:
-                return self.operations[type(node.op)](left, right)  # type: ignore
-            except KeyError:
-                raise ValueError(f"Bad Operator: {node.op.__class__.__name__}")
+            return self.evaluate(_cached_ast_parse(node))
+
+        handler = self._dispatch.get(type(node))
+        if handler is not None:
+            return handler(node)
+
+        if isinstance(node, (list, tuple)):
+            return self._eval_seq(node)
+
+        print(type(node))
+        print(type(node) == list)
+        print(type(node) == tuple)
+        raise TypeError(f"Unsupported operation: {node.__class__.__name__}")
+
+    def _eval_module(self, node):
+        evaluate = self.evaluate
+        values = []
+        append = values.append
+        for body in node.body:
+            append(evaluate(body))
+        if len(values) == 1:
+            values = values[0]
+        return values
+
+    def _eval_seq(self, node):
+        print("found seq")
+        print(node)
+        print(ast.literal_eval(node))
+        return [self.evaluate(str(child_node)) for child_node in ast.literal_eval(node)]
+
+    def _eval_expr(self, node):
+        return self.evaluate(node.value)
+
+    def _eval_binop(self, node):
+        evaluate = self.evaluate
+        # constants hold their value already; skip the dispatch round-trip
+        left = node.left
+        left = left.value if type(left) is ast.Constant else evaluate(left)
+        right = node.right
+        right = right.value if type(right) is ast.Constant else evaluate(right)
+        try:
+            return self.operations[type(node.op)](left, right)  # type: ignore
+        except KeyError:
+            raise ValueError(f"Bad Operator: {node.op.__class__.__name__}")
 
-        elif isinstance(node, ast.UnaryOp):
-            try:
-                return self.operations[type(node.op)](self.evaluate(node.operand))  # type: ignore
-            except KeyError:
-                raise ValueError(f"Bad Operator: {node.op.__class__.__name__}")
+    def _eval_unaryop(self, node):
+        operand = node.operand
+        operand = operand.value if type(operand) is ast.Constant else self.evaluate(operand)
+        try:
+            return self.operations[type(node.op)](operand)  # type: ignore
+        except KeyError:
+            raise ValueError(f"Bad Operator: {node.op.__class__.__name__}")
+
+    def _eval_assign(self, node):
+        value = self.evaluate(node.value)
+        for target in node.targets:
+            self.vars[target.id] = value  # type: ignore
+        return value
 
-        elif isinstance(node, ast.Assign):
-            value = self.evaluate(node.value)
-            for target in node.targets:
-                self.vars[target.id] = value  # type: ignore
-            return value
+    def _eval_compare(self, node):
+        left = self.evaluate(node.left)
+        right = self.evaluate(node.comparators[0])
 
-        elif isinstance(node, ast.Compare):
-            left = self.evaluate(node.left)
-            right = self.evaluate(node.comparators[0])
+        op = node.ops[0]
+        try:
+            return self.operations[type(op)](left, right)  # type: ignore
+        except KeyError:
+            raise ValueError(f"Bad Operator: {op.__class__.__name__}")
+
+    def _eval_call(self, node):
+        evaluate = self.evaluate
+        if isinstance(node.func,
+                      ast.Constant):  # implied multiplication of number
+            return node.func.value * evaluate(node.args[0])
+        elif isinstance(node.func,
+                        ast.Name):  # implied multiplication of var/const
+            val = self._lookup.get(node.func.id, _MISSING)
+            if val is not _MISSING:
+                return val * evaluate(node.args[0])
+
+        func = node.func.id  # type: ignore
+
+        if func == 'Unit':
+            if len(node.args) == 1:
+                return _cached_unit(node.args[0].value)  # type: ignore
+            elif len(node.args) == 2:
+                return _cached_unit(evaluate(node.args[0]),
+                                    node.args[1].value)  # type: ignore
+            else:
+                return _cached_unit(evaluate(node.args[0]),
+                                    node.args[1].value, node.args[2].value)  # type: ignore
+                # return Unit(node.args[0].value, node.args[1].value)
 
-            op = node.ops[0]
-            try:
-                return self.operations[type(op)](left, right)  # type: ignore
-            except KeyError:
-                raise ValueError(f"Bad Operator: {op.__class__.__name__}")
-
-        elif isinstance(node, ast.Call):
-            if isinstance(node.func,
-                          ast.Constant):  # implied multiplication of number
-                return node.func.value * self.evaluate(node.args[0])
-            elif isinstance(node.func,
-                            ast.Name):  # implied multiplication of var/const
-                const = self.constants.get(node.func.id)
-                var = self.vars.get(node.func.id)
-                if any([var, const]):
-                    return (const or var) * self.evaluate(node.args[0])
-
-            func = node.func.id  # type: ignore
-
-            if func == 'Unit':
-                if len(node.args) == 1:
-                    return Unit(node.args[0].value)  # type: ignore
-                elif len(node.args) == 2:
-                    return Unit(self.evaluate(node.args[0]),
-                                node.args[1].value)  # type: ignore
-                else:
-                    return Unit(self.evaluate(node.args[0]),
-                                node.args[1].value, node.args[2].value)  # type: ignore
-                    # return Unit(node.args[0].value, node.args[1].value)
-
-            args = [self.evaluate(arg) for arg in node.args]
-
-            if func in self.angle_funcs:  # convert to radians
-                if isinstance(args[0], Unit):
-                    args[0] = args[0].to('rad')
+        args = [arg.value if type(arg) is ast.Constant else evaluate(arg)
+                for arg in node.args]
 
-            try:
-                return self.functions[func](*args)
-            except KeyError:
-                raise ValueError(f"Bad Function: {func}")
-        elif isinstance(node, ast.Name):
-            const = self.constants.get(node.id)
-            var = self.vars.get(node.id)
-            if not any([const, var]):
-                try:  # could be unit with no value
-                    return Unit(node.id)
-                except:
-                    raise ValueError(f"Bad constant or variable: {node.id}")
-            else:
-                return var or const
+        if func in self.angle_funcs:  # convert to radians
+            if isinstance(args[0], Unit):
+                args[0] = args[0].to('rad')
 
-        elif isinstance(node, ast.Constant):
-            return node.value
-        else:
-            print(type(node))
-            print(type(node) == list)
-            print(type(node) == tuple)
-            raise TypeError(f"Unsupported operation: {node.__class__.__name__}")
+        try:
+            return self.functions[func](*args)
+        except KeyError:
+            raise ValueError(f"Bad Function: {func}")
+
+    def _eval_name(self, node):
+        try:
+            return self._lookup[node.id]
+        except KeyError:
+            try:  # could be unit with no value
+                return Unit(node.id)
+            except:
+                raise ValueError(f"Bad constant or variable: {node.id}")
+
+    def _eval_constant(self, node):
+        return node.value
+
+    def reset_vars(self):
+        """Replace vars with a fresh dict and rebuild the lookup chain."""
+        self.vars = VarsDict()
+        self._lookup = ChainMap(self.vars, self.constants)
 
     def convert(self, from_unit, to_unit):
         if isinstance(from_unit, Unit):
@@ -404,6 +619,8 @@ class BeeParser():
 
 
 class BeeNotepad:
+    __slots__ = ('input', 'output', 'parser', '_parse', '_vars',
+                 '_line_cache')
 
     def __init__(self):
         self.input = []
@@ -411,9 +628,34 @@ class BeeNotepad:
         self.parser = BeeParser()
         self._parse = self.parser.parse
         self._vars = self.parser.vars
+        # (line, vars snapshot) -> output; replaying an unchanged notepad
+        # (every keystroke in the GUI) skips the parse for cached lines
+        self._line_cache = {}
 
     def append(self, text, debug=False):
-        out = self._parse(text, debug)
+        if debug:
+            out = self.parser.parse_debug(text)
+        else:
+            vars = self.parser.vars
+            key = (text, tuple(vars.items()))
+            try:
+                out = self._line_cache.get(key, _MISSING)
+            except TypeError:  # unhashable var value (e.g. a Unit)
+                key = None
+                out = _MISSING
+            if out is _MISSING:
+                version = vars.version
+                out = self._parse(text)
+                if key is not None and vars.version == version:
+                    # only lines that assigned nothing are safe to replay;
+                    # evict the oldest entry instead of dropping the lot
+                    cache = self._line_cache
+                    if len(cache) >= 4096:
+                        del cache[next(iter(cache))]
+                    cache[key] = copy.copy(out) if isinstance(
+                        out, Unit) else out
+            elif isinstance(out, Unit):
+                out = copy.copy(out)  # Unit.to() converts in place
         if out:
             self.input.append(text)
             self.output.append(out)
@@ -421,10 +663,20 @@ class BeeNotepad:
         self._vars['ans'] = out
         return out
 
+    def append_many(self, texts):
+        """Append a batch of input lines, returning a list of outputs.
+
+        Repeated formulas hit the cached compiled-expression fast path,
+        so evaluating the same expression across a range of variable
+        values only parses it once.
+        """
+        append = self.append
+        return [append(text) for text in texts]
+
     def clear(self):
         self.input = []
         self.output = []
-        self.parser.vars = {}
+        self.parser.reset_vars()
 
 
 ####